@@ -1,29 +1,32 @@
+import argparse
+import collections
 import cv2
 import numpy as np
 import threading
-import queue
 import time
 from pythonosc import dispatcher, osc_server
 import socket
+from overlay_numba import darken_strip
+from priority import raise_process_priority, pin_current_thread
+
+MJPG_FOURCC = cv2.VideoWriter_fourcc(*'MJPG')
 
 class TimecodeReceiver:
     def __init__(self, port=6575):
         self.port = port
         self.latest_timecode = "00:00:00:00:0"
-        self.timecode_lock = threading.Lock()
         self.running = False
         self.measured_offset = 0.0  # Can be adjusted if needed
-        
+
     def timecode_handler(self, address, *args):
         """Handle incoming OSC timecode messages"""
         if args:
-            with self.timecode_lock:
-                self.latest_timecode = str(args[0:5])
-    
+            # Plain attribute store is atomic under the GIL, no lock needed
+            self.latest_timecode = ":".join(str(a) for a in args[:5])
+
     def get_timecode(self):
         """Get the latest timecode"""
-        with self.timecode_lock:
-            return self.latest_timecode
+        return self.latest_timecode
     
     def start(self):
         """Start listening for OSC timecode"""
@@ -31,21 +34,34 @@ class TimecodeReceiver:
         
         disp = dispatcher.Dispatcher()
         disp.map("/asil/clock", self.timecode_handler)
-        
-        # sock = self.server.socket
-        ip = socket.gethostbyname(socket.gethostname())
-        
-        # Create server that listens on multicast
+
+        # Bind to all interfaces; resolving the hostname did a blocking
+        # DNS lookup and pinned the server to a single interface
         self.server = osc_server.ThreadingOSCUDPServer(
-            (ip, self.port), disp
+            ("0.0.0.0", self.port), disp
         )
-        
-        self.thread = threading.Thread(target=self.server.serve_forever)
+
+        # Enable multicast reception
+        sock = self.server.socket
+        group = socket.inet_aton("239.255.0.1")  # Multicast group
+        mreq = group + socket.inet_aton("0.0.0.0")
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+
+        # Enlarge the UDP receive buffer so 120Hz timecode bursts
+        # don't get dropped (the OS may cap this below 4MB)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4_000_000)
+
+        self.thread = threading.Thread(target=self._serve)
         self.thread.daemon = True
         self.thread.start()
-        
+
         print(f"Listening for OSC timecode on port {self.port} (multicast 239.255.0.1)")
         print(f"OSC address: /asil/clock")
+
+    def _serve(self):
+        # Keep the OSC handler off the capture core
+        pin_current_thread(0)
+        self.server.serve_forever()
     
     def stop(self):
         """Stop the OSC server"""
@@ -53,13 +69,95 @@ class TimecodeReceiver:
         if hasattr(self, 'server'):
             self.server.shutdown()
 
-			
-			
-			
+
+
+
+class _CaptureThread:
+    def __init__(self, cap):
+        self.cap = cap
+        self.cap_lock = threading.Lock()
+        self.frame_ready = threading.Event()
+        self.running = False
+
+    def start(self):
+        """Start grabbing frames in the background"""
+        self.running = True
+        self.thread = threading.Thread(target=self._grab_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _grab_loop(self):
+        # Dedicated core for capture so the scheduler doesn't bounce it
+        pin_current_thread(1)
+
+        # grab() only pulls the frame off the driver queue, the expensive
+        # MJPEG decode happens in retrieve() when the consumer asks for it
+        while self.running:
+            with self.cap_lock:
+                grabbed = self.cap.grab()
+            if grabbed:
+                self.frame_ready.set()
+            else:
+                time.sleep(0.005)
+
+    def read(self):
+        """Decode and return the most recently grabbed frame"""
+        if not self.frame_ready.wait(timeout=1.0):
+            return False, None
+        with self.cap_lock:
+            self.frame_ready.clear()
+            return self.cap.retrieve()
+
+    def stop(self):
+        """Stop the grab thread"""
+        self.running = False
+        if hasattr(self, 'thread'):
+            self.thread.join(timeout=2)
+
+
+class _PreviewThread:
+    """Show the preview window on its own thread at ~30Hz"""
+
+    def __init__(self, window_name):
+        self.window_name = window_name
+        self.latest = None
+        self.quit_requested = False
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._display_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def publish(self, frame):
+        """Hand the latest frame to the display thread (no copy)"""
+        self.latest = frame
+
+    def _display_loop(self):
+        # Owns imshow/waitKey so the capture loop never waits on the UI
+        while self.running:
+            frame = self.latest
+            if frame is not None:
+                # Nearest-neighbour is plenty for a human-facing preview
+                preview = cv2.resize(frame, (640, 360),
+                                    interpolation=cv2.INTER_NEAREST)
+                cv2.imshow(self.window_name, preview)
+            if cv2.waitKey(33) & 0xFF == ord('q'):
+                self.quit_requested = True
+
+    def stop(self):
+        """Stop the display thread"""
+        self.running = False
+        if hasattr(self, 'thread'):
+            self.thread.join(timeout=2)
+
+
 class LocalSaver:
-    def __init__(self, camera_name, camera_id=0):
+    def __init__(self, camera_name, camera_id=0, show_preview=True):
         self.camera_name = camera_name
         self.camera_id = camera_id
+        self.show_preview = show_preview
         self.width = 1280
         self.height = 720
         self.fps = 30
@@ -67,13 +165,26 @@ class LocalSaver:
         # Initialize camera
         self.cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
         self._setup_camera()
-        
+
+        # Background grab thread, frames are decoded on demand
+        self.capture = _CaptureThread(self.cap)
+
+        # The camera name never changes, so rasterize it once into a
+        # sprite and blit that per frame instead of calling putText
+        self._label_sprite = np.zeros((80, self.width, 3), dtype=np.uint8)
+        cv2.putText(self._label_sprite, self.camera_name, (10, 35),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
+        self._label_mask = self._label_sprite.any(axis=2, keepdims=True)
+
         # Timecode receiver
         self.timecode_receiver = TimecodeReceiver()
-        
+
+        # Preview window runs on its own thread
+        self.preview = _PreviewThread(f'Preview - {camera_name}')
+
         # Control
         self.running = False
-        
+
         print(f"'{camera_name}' initialized")
     
     def _setup_camera(self):
@@ -81,7 +192,7 @@ class LocalSaver:
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
         self.cap.set(cv2.CAP_PROP_FPS, self.fps)
-        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        self.cap.set(cv2.CAP_PROP_FOURCC, MJPG_FOURCC)
         self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         # Disable auto settings for consistent timing
@@ -99,43 +210,53 @@ class LocalSaver:
     def add_overlay(self, frame, timecode, actual_fps):
         """Add camera name and timecode overlay to frame"""
         # Create semi-transparent overlay at top
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (self.width, 80), (0, 0, 0), -1)
-        frame = cv2.addWeighted(overlay, 0.6, frame, 0.4, 0)
-        
-        # Add camera name
-        cv2.putText(frame, self.camera_name, (10, 35),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
-				   
+        darken_strip(frame, 80, 0.4)
+
+        # Blit the pre-rendered camera name, cropped in case the camera
+        # delivered a different mode than the sprite was built for
+        w = min(frame.shape[1], self._label_sprite.shape[1])
+        np.copyto(frame[:80, :w], self._label_sprite[:, :w],
+                  where=self._label_mask[:, :w])
+
         # Add fps name
-        cv2.putText(frame, f"FPS: {actual_fps}", (600, 35),
+        cv2.putText(frame, f"FPS: {actual_fps:.1f}", (600, 35),
                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
         
         # Add timecode
         cv2.putText(frame, f"TC: {timecode}", (10, 70),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        print(f"Timecode: {timecode}")
         return frame
     
     def run(self):
         """Main transmission loop"""
         self.running = True
+        raise_process_priority()
         self.timecode_receiver.start()
-        
+        self.capture.start()
+        if self.show_preview:
+            self.preview.start()
+
         print(f"\showing '{self.camera_name}' ")
         print("Press 'q' in preview window to quit\n")
         
         frame_count = 0
-        start_time = time.time()
+        # Ring of the last 60 frame timestamps gives instantaneous FPS
+        # instead of a lifetime average; perf_counter has sub-us
+        # resolution where time.time() ticks at ~15ms on Windows
+        ts_ring = collections.deque(maxlen=60)
         actual_fps = 0
-		
+
         while self.running:
-            ret, frame = self.cap.read()
-            
+            ret, frame = self.capture.read()
+
             if not ret:
                 print("Failed to read frame from camera")
                 continue
-            
+
+            ts_ring.append(time.perf_counter())
+            if len(ts_ring) == ts_ring.maxlen:
+                actual_fps = (len(ts_ring) - 1) / (ts_ring[-1] - ts_ring[0])
+
             # Get current timecode
             timecode = self.timecode_receiver.get_timecode()
             
@@ -143,18 +264,15 @@ class LocalSaver:
             frame = self.add_overlay(frame, timecode, actual_fps)
 
             frame_count += 1
-            
-            # Show preview (scaled down)
-            preview = cv2.resize(frame, (640, 360))
-            cv2.imshow(f'Preview - {self.camera_name}', preview)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+
+            # Publish to the preview thread; no waitKey in this loop
+            if self.show_preview:
+                self.preview.publish(frame)
+                if self.preview.quit_requested:
+                    break
             
             # Print stats every 60 frames
             if frame_count % 60 == 0:
-                elapsed = time.time() - start_time
-                actual_fps = frame_count / elapsed
                 print(f"Frames: {frame_count}, FPS: {actual_fps:.1f}, TC: {timecode}")
         
         self.stop()
@@ -163,7 +281,9 @@ class LocalSaver:
         """Cleanup resources"""
         self.running = False
         self.timecode_receiver.stop()
-        
+        self.capture.stop()
+        self.preview.stop()
+
         if self.cap:
             self.cap.release()
         
@@ -182,8 +302,8 @@ def list_cameras():
     for i in range(10):
         cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
         if cap.isOpened():
-            ret, _ = cap.read()
-            if ret:
+            # grab() is enough to probe the camera, no need to decode a frame
+            if cap.grab():
                 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
                 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
                 fps = int(cap.get(cv2.CAP_PROP_FPS))
@@ -199,6 +319,11 @@ def list_cameras():
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--no-preview', action='store_true',
+                       help='run headless without the preview window')
+    args = parser.parse_args()
+
     print("="*60)
     print("NDI CAMERA SAVER")
     print("="*60)
@@ -248,7 +373,8 @@ def main():
     
     # Create and run transmitter
     try:
-        transmitter = LocalSaver(camera_name, camera_id)
+        transmitter = LocalSaver(camera_name, camera_id,
+                                show_preview=not args.no_preview)
         transmitter.run()
     except Exception as e:
         print(f"Error: {e}")
@@ -7,13 +7,23 @@ from datetime import datetime
 import os
 import NDIlib as ndi
 
+MP4V_FOURCC = cv2.VideoWriter_fourcc(*'mp4v')
+
+# There is no cv2.FONT_HERSHEY_BOLD; duplex with thickness 3 reads as bold
+_FONT = cv2.FONT_HERSHEY_DUPLEX
+
+
 class NDIReceiver:
     def __init__(self, source_name):
         self.source_name = source_name
-        self.frame_queue = queue.Queue(maxsize=5)
         self.running = False
         self.ndi_recv = None
-        self.latest_frame = None
+        # Triple buffer: one slot holds the newest frame (_ready), one is
+        # pinned by the reader (_held), and the receive loop writes the
+        # third, so the reader's frame is never overwritten under it
+        self._bufs = [None, None, None]
+        self._ready = -1
+        self._held = -1
         self.frame_lock = threading.Lock()
         
     def connect(self):
@@ -28,24 +38,16 @@ class NDIReceiver:
         
         # Wait for sources
         print(f"Looking for NDI source: {self.source_name}")
-        sources = []
+        source = None
         for _ in range(20):  # Try for 10 seconds
             sources = ndi.find_get_current_sources(ndi_find)
-            for source in sources:
-                if source.ndi_name == self.source_name:
-                    print(f"Found: {self.source_name}")
-                    break
-            if any(s.ndi_name == self.source_name for s in sources):
+            source = next(
+                (s for s in sources if s.ndi_name == self.source_name), None)
+            if source is not None:
+                print(f"Found: {self.source_name}")
                 break
             time.sleep(0.5)
-        
-        # Find the source
-        source = None
-        for s in sources:
-            if s.ndi_name == self.source_name:
-                source = s
-                break
-        
+
         if source is None:
             print(f"Could not find NDI source: {self.source_name}")
             ndi.find_destroy(ndi_find)
@@ -75,20 +77,31 @@ class NDIReceiver:
             t, v, _, _ = ndi.recv_capture_v2(self.ndi_recv, 100)
             
             if t == ndi.FRAME_TYPE_VIDEO:
-                # Convert NDI frame to numpy array
-                frame = np.copy(v.data)
+                # Copy into the slot that is neither ready nor held
+                with self.frame_lock:
+                    busy = (self._ready, self._held)
+                write = next(i for i in range(3) if i not in busy)
+                buf = self._bufs[write]
+                if buf is None or buf.shape[:2] != v.data.shape[:2]:
+                    buf = np.empty(v.data.shape[:2] + (3,), dtype=np.uint8)
+                    self._bufs[write] = buf
+
+                # BGRX means the X channel carries no data, so slicing off
+                # the 4th channel gives us BGR without a cvtColor pass
+                np.copyto(buf, v.data[:, :, :3])
                 ndi.recv_free_video_v2(self.ndi_recv, v)
-                
-                # Convert BGRA to BGR
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                
+
                 with self.frame_lock:
-                    self.latest_frame = frame
+                    self._ready = write
     
     def get_latest_frame(self):
-        """Get the latest received frame"""
+        """Get the latest received frame (read-only until the next call)"""
         with self.frame_lock:
-            return self.latest_frame.copy() if self.latest_frame is not None else None
+            if self._ready < 0:
+                return None
+            # Pin this slot so the receive loop writes elsewhere
+            self._held = self._ready
+            return self._bufs[self._held]
     
     def start(self):
         """Start receiving"""
@@ -110,14 +123,48 @@ class NDIReceiver:
             ndi.recv_destroy(self.ndi_recv)
 
 
+class _EncoderWorker:
+    """Encode frames for one camera on a dedicated thread"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.q = queue.Queue(maxsize=4)
+        self.thread = threading.Thread(target=self._encode_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _encode_loop(self):
+        while True:
+            frame = self.q.get()
+            if frame is None:
+                break
+            self.writer.write(frame)
+
+    def submit(self, frame):
+        """Queue a frame for encoding; drop it if the encoder is behind"""
+        # Copy at enqueue time: the caller's frame is the receiver's
+        # shared buffer and will be rewritten while we sit in the queue
+        try:
+            self.q.put_nowait(frame.copy())
+        except queue.Full:
+            pass
+
+    def stop(self):
+        """Flush the queue, stop the thread and release the writer"""
+        self.q.put(None)
+        self.thread.join()
+        self.writer.release()
+
+
 class MultiCameraRecorder:
     def __init__(self, source_names):
         self.source_names = source_names
         self.receivers = {}
-        self.writers = {}
+        self.encoders = {}
         self.recording = False
         self.running = False
         self.output_dir = None
+        self._black_tile = None  # cached filler for empty grid slots
         
     def connect_sources(self):
         """Connect to all NDI sources"""
@@ -143,17 +190,15 @@ class MultiCameraRecorder:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.output_dir = f"recordings/{timestamp}"
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        
+
         for name, receiver in self.receivers.items():
             # Get frame to determine size
             frame = receiver.get_latest_frame()
             if frame is not None:
                 h, w = frame.shape[:2]
                 output_path = f"{self.output_dir}/{name}.mp4"
-                writer = cv2.VideoWriter(output_path, fourcc, 60, (w, h))
-                self.writers[name] = writer
+                writer = cv2.VideoWriter(output_path, MP4V_FOURCC, 60, (w, h))
+                self.encoders[name] = _EncoderWorker(writer)
         
         self.recording = True
         print(f"\n🔴 RECORDING to: {self.output_dir}")
@@ -161,11 +206,11 @@ class MultiCameraRecorder:
     def stop_recording(self):
         """Stop recording"""
         self.recording = False
-        
-        for writer in self.writers.values():
-            writer.release()
-        
-        self.writers.clear()
+
+        for encoder in self.encoders.values():
+            encoder.stop()
+
+        self.encoders.clear()
         print(f"\n⏹ Recording stopped: {self.output_dir}")
     
     def create_grid_display(self, frames):
@@ -195,44 +240,42 @@ class MultiCameraRecorder:
         display_w = w // 2
         display_h = h // 2
         
-        # Create grid
-        grid = np.zeros((display_h * rows, display_w * cols, 3), dtype=np.uint8)
-        
-        for idx, (name, frame) in enumerate(frames.items()):
+        # Cached black filler for cameras without a frame yet
+        tile_shape = (display_h, display_w, 3)
+        if self._black_tile is None or self._black_tile.shape != tile_shape:
+            self._black_tile = np.zeros(tile_shape, dtype=np.uint8)
+
+        tiles = []
+        for frame in frames.values():
             if frame is None:
+                tiles.append(self._black_tile)
                 continue
-            
-            row = idx // cols
-            col = idx % cols
-            
-            if row >= rows:
-                break
-            
-            # Add recording indicator if recording
+
+            tile = cv2.resize(frame, (display_w, display_h))
+
+            # Recording indicator drawn into the tile; the source frame is
+            # shared with the receiver and the writer, so leave it alone
             if self.recording:
-                # Red border
-                cv2.rectangle(frame, (0, 0), (w-1, h-1), (0, 0, 255), 20)
-                # Red background behind text
-                overlay = frame.copy()
-                cv2.rectangle(overlay, (0, 0), (w, 100), (0, 0, 180), -1)
-                frame = cv2.addWeighted(overlay, 0.7, frame, 0.3, 0)
-            
-            # Resize for grid
-            resized = cv2.resize(frame, (display_w, display_h))
-            
-            # Place in grid
-            y_start = row * display_h
-            y_end = y_start + display_h
-            x_start = col * display_w
-            x_end = x_start + display_w
-            
-            grid[y_start:y_end, x_start:x_end] = resized
+                cv2.rectangle(tile, (0, 0), (display_w-1, display_h-1),
+                             (0, 0, 255), 10)
+
+            tiles.append(tile)
+
+        # Pad to a full grid and assemble row-wise; hconcat/vconcat are
+        # single memcpys instead of Python-level slice assignments
+        tiles = tiles[:rows * cols]
+        while len(tiles) < rows * cols:
+            tiles.append(self._black_tile)
+
+        row_imgs = [cv2.hconcat(tiles[r * cols:(r + 1) * cols])
+                    for r in range(rows)]
+        grid = cv2.vconcat(row_imgs)
         
         # Add recording indicator to grid
         if self.recording:
             cv2.circle(grid, (40, 40), 20, (0, 0, 255), -1)
             cv2.putText(grid, "RECORDING", (70, 50),
-                       cv2.FONT_HERSHEY_BOLD, 1.0, (0, 0, 255), 3)
+                       _FONT, 1.0, (0, 0, 255), 3)
         
         return grid
     
@@ -257,9 +300,9 @@ class MultiCameraRecorder:
                     frames[name] = frame
                     frame_counts[name] += 1
                     
-                    # Write frame if recording
-                    if self.recording and name in self.writers:
-                        self.writers[name].write(frame)
+                    # Hand frame off to the encoder thread if recording
+                    if self.recording and name in self.encoders:
+                        self.encoders[name].submit(frame)
             
             # Create and display grid
             grid = self.create_grid_display(frames)
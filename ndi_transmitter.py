@@ -1,30 +1,36 @@
+import argparse
+import collections
 import cv2
 import numpy as np
 import threading
-import queue
 import time
 from pythonosc import dispatcher, osc_server
 import NDIlib as ndi
 import socket
+from overlay_numba import bgr_to_bgra_with_strip
+from priority import raise_process_priority, pin_current_thread
+
+MJPG_FOURCC = cv2.VideoWriter_fourcc(*'MJPG')
+
+# There is no cv2.FONT_HERSHEY_BOLD; duplex with thickness 3 reads as bold
+_FONT = cv2.FONT_HERSHEY_DUPLEX
 
 class TimecodeReceiver:
     def __init__(self, port=6667):
         self.port = port
         self.latest_timecode = "00:00:00:00:0"
-        self.timecode_lock = threading.Lock()
         self.running = False
         self.measured_offset = 0.0  # Can be adjusted if needed
-        
+
     def timecode_handler(self, address, *args):
         """Handle incoming OSC timecode messages"""
         if args:
-            with self.timecode_lock:
-                self.latest_timecode = str(args[0])
-    
+            # Plain attribute store is atomic under the GIL, no lock needed
+            self.latest_timecode = str(args[0])
+
     def get_timecode(self):
         """Get the latest timecode"""
-        with self.timecode_lock:
-            return self.latest_timecode
+        return self.latest_timecode
     
     def start(self):
         """Start listening for OSC timecode"""
@@ -43,12 +49,21 @@ class TimecodeReceiver:
         group = socket.inet_aton("239.255.0.1")  # Multicast group
         mreq = group + socket.inet_aton("0.0.0.0")
         sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+
+        # Enlarge the UDP receive buffer so 120Hz timecode bursts
+        # don't get dropped (the OS may cap this below 4MB)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4_000_000)
         
-        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread = threading.Thread(target=self._serve)
         self.thread.daemon = True
         self.thread.start()
-        
+
         print(f"Listening for OSC timecode on port {self.port} (multicast 239.255.0.1)")
+
+    def _serve(self):
+        # Keep the OSC handler off the capture core
+        pin_current_thread(0)
+        self.server.serve_forever()
     
     def stop(self):
         """Stop the OSC server"""
@@ -57,18 +72,110 @@ class TimecodeReceiver:
             self.server.shutdown()
 
 
+class _CaptureThread:
+    def __init__(self, cap):
+        self.cap = cap
+        self.cap_lock = threading.Lock()
+        self.frame_ready = threading.Event()
+        self.running = False
+
+    def start(self):
+        """Start grabbing frames in the background"""
+        self.running = True
+        self.thread = threading.Thread(target=self._grab_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _grab_loop(self):
+        # Dedicated core for capture so the scheduler doesn't bounce it
+        pin_current_thread(1)
+
+        # grab() only pulls the frame off the driver queue, the expensive
+        # MJPEG decode happens in retrieve() when the consumer asks for it
+        while self.running:
+            with self.cap_lock:
+                grabbed = self.cap.grab()
+            if grabbed:
+                self.frame_ready.set()
+            else:
+                time.sleep(0.005)
+
+    def read(self):
+        """Decode and return the most recently grabbed frame"""
+        if not self.frame_ready.wait(timeout=1.0):
+            return False, None
+        with self.cap_lock:
+            self.frame_ready.clear()
+            return self.cap.retrieve()
+
+    def stop(self):
+        """Stop the grab thread"""
+        self.running = False
+        if hasattr(self, 'thread'):
+            self.thread.join(timeout=2)
+
+
+class _PreviewThread:
+    """Show the preview window on its own thread at ~30Hz"""
+
+    def __init__(self, window_name):
+        self.window_name = window_name
+        self.latest = None
+        self.quit_requested = False
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._display_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def publish(self, frame):
+        """Hand the latest frame to the display thread (no copy)"""
+        self.latest = frame
+
+    def _display_loop(self):
+        # Owns imshow/waitKey so the transmit loop never waits on the UI
+        while self.running:
+            frame = self.latest
+            if frame is not None:
+                # Nearest-neighbour is plenty for a human-facing preview
+                preview = cv2.resize(frame, (640, 360),
+                                    interpolation=cv2.INTER_NEAREST)
+                cv2.imshow(self.window_name, preview)
+            if cv2.waitKey(33) & 0xFF == ord('q'):
+                self.quit_requested = True
+
+    def stop(self):
+        """Stop the display thread"""
+        self.running = False
+        if hasattr(self, 'thread'):
+            self.thread.join(timeout=2)
+
+
 class NDITransmitter:
-    def __init__(self, camera_name, camera_id=0):
+    def __init__(self, camera_name, camera_id=0, show_preview=True):
         self.camera_name = camera_name
         self.camera_id = camera_id
+        self.show_preview = show_preview
         self.width = 1280
         self.height = 720
         self.fps = 60
-        
+
         # Initialize camera
         self.cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
         self._setup_camera()
-        
+
+        # Background grab thread, frames are decoded on demand
+        self.capture = _CaptureThread(self.cap)
+
+        # The camera name never changes, so rasterize it once into a
+        # sprite and blit that per frame instead of calling putText
+        self._label_sprite = np.zeros((80, self.width, 3), dtype=np.uint8)
+        cv2.putText(self._label_sprite, self.camera_name, (10, 35),
+                   _FONT, 1.2, (0, 255, 255), 3)
+        self._label_mask = self._label_sprite.any(axis=2, keepdims=True)
+
         # Initialize NDI
         if not ndi.initialize():
             raise RuntimeError("Failed to initialize NDI")
@@ -84,9 +191,19 @@ class NDITransmitter:
         if self.ndi_send is None:
             raise RuntimeError("Failed to create NDI sender")
         
+        # Reused BGRA conversion buffers; two slots so an in-flight NDI
+        # send never reads the buffer currently being filled
+        self._bgra_bufs = [
+            np.empty((self.height, self.width, 4), dtype=np.uint8),
+            np.empty((self.height, self.width, 4), dtype=np.uint8),
+        ]
+
         # Timecode receiver
         self.timecode_receiver = TimecodeReceiver()
-        
+
+        # Preview window runs on its own thread
+        self.preview = _PreviewThread(f'Preview - {camera_name}')
+
         # Control
         self.running = False
         
@@ -97,7 +214,7 @@ class NDITransmitter:
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
         self.cap.set(cv2.CAP_PROP_FPS, self.fps)
-        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        self.cap.set(cv2.CAP_PROP_FOURCC, MJPG_FOURCC)
         self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         # Disable auto settings for consistent timing
@@ -107,52 +224,69 @@ class NDITransmitter:
         actual_w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         actual_h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         actual_fps = int(self.cap.get(cv2.CAP_PROP_FPS))
-        
+
+        # cap.set is best-effort; track the mode the driver actually
+        # granted so the BGRA buffers and NDI frame dims match the frames
+        self.width = actual_w
+        self.height = actual_h
+
         print(f"Camera configured: {actual_w}x{actual_h} @ {actual_fps}fps")
-    
-    def add_overlay(self, frame, timecode):
-        """Add camera name and timecode overlay to frame"""
-        # Create semi-transparent overlay at top
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (self.width, 80), (0, 0, 0), -1)
-        frame = cv2.addWeighted(overlay, 0.6, frame, 0.4, 0)
-        
-        # Add camera name
-        cv2.putText(frame, self.camera_name, (10, 35),
-                   cv2.FONT_HERSHEY_BOLD, 1.2, (0, 255, 255), 3)
-        
+
+    def add_overlay(self, frame_bgra, timecode):
+        """Add camera name and timecode overlay to a BGRA frame"""
+        # Blit the pre-rendered camera name, cropped in case the camera
+        # delivered a different mode than the sprite was built for
+        w = min(frame_bgra.shape[1], self._label_sprite.shape[1])
+        np.copyto(frame_bgra[:80, :w, :3], self._label_sprite[:, :w],
+                  where=self._label_mask[:, :w])
+
         # Add timecode
-        cv2.putText(frame, f"TC: {timecode}", (10, 70),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        return frame
-    
+        cv2.putText(frame_bgra, f"TC: {timecode}", (10, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255, 255), 2)
+
+        return frame_bgra
+
     def run(self):
         """Main transmission loop"""
         self.running = True
+        raise_process_priority()
         self.timecode_receiver.start()
-        
+        self.capture.start()
+        if self.show_preview:
+            self.preview.start()
+
         print(f"\nTransmitting '{self.camera_name}' on NDI network...")
         print("Press 'q' in preview window to quit\n")
         
         frame_count = 0
-        start_time = time.time()
-        
+        # Ring of the last 60 frame timestamps gives instantaneous FPS
+        # instead of a lifetime average; perf_counter has sub-us
+        # resolution where time.time() ticks at ~15ms on Windows
+        ts_ring = collections.deque(maxlen=60)
+        actual_fps = 0
+        last_preview = 0.0
+
         while self.running:
-            ret, frame = self.cap.read()
-            
+            ret, frame = self.capture.read()
+
             if not ret:
                 print("Failed to read frame from camera")
                 continue
-            
+
+            ts_ring.append(time.perf_counter())
+            if len(ts_ring) == ts_ring.maxlen:
+                actual_fps = (len(ts_ring) - 1) / (ts_ring[-1] - ts_ring[0])
+
             # Get current timecode
             timecode = self.timecode_receiver.get_timecode()
-            
-            # Add overlay
-            frame = self.add_overlay(frame, timecode)
-            
-            # Convert to NDI format (BGRA)
-            frame_bgra = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+
+            # Fused BGRA conversion + darkened strip in a single pass
+            # over the frame, into a reused buffer
+            frame_bgra = self._bgra_bufs[frame_count % 2]
+            bgr_to_bgra_with_strip(frame, frame_bgra, 80, 0.4)
+
+            # Add overlay text
+            self.add_overlay(frame_bgra, timecode)
             
             # Create NDI video frame
             video_frame = ndi.VideoFrameV2()
@@ -168,18 +302,20 @@ class NDITransmitter:
             ndi.send_send_video_v2(self.ndi_send, video_frame)
             
             frame_count += 1
-            
-            # Show preview (scaled down)
-            preview = cv2.resize(frame, (640, 360))
-            cv2.imshow(f'Preview - {self.camera_name}', preview)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+
+            # Publish a copy to the preview thread at its ~30Hz cadence;
+            # frame_bgra is a reused send buffer the next iterations will
+            # rewrite, so the preview must not resize it asynchronously
+            if self.show_preview:
+                now = time.perf_counter()
+                if now - last_preview >= 1 / 30:
+                    self.preview.publish(frame_bgra.copy())
+                    last_preview = now
+                if self.preview.quit_requested:
+                    break
             
             # Print stats every 60 frames
             if frame_count % 60 == 0:
-                elapsed = time.time() - start_time
-                actual_fps = frame_count / elapsed
                 print(f"Frames: {frame_count}, FPS: {actual_fps:.1f}, TC: {timecode}")
         
         self.stop()
@@ -188,7 +324,9 @@ class NDITransmitter:
         """Cleanup resources"""
         self.running = False
         self.timecode_receiver.stop()
-        
+        self.capture.stop()
+        self.preview.stop()
+
         if self.cap:
             self.cap.release()
         
@@ -209,8 +347,8 @@ def list_cameras():
     for i in range(10):
         cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
         if cap.isOpened():
-            ret, _ = cap.read()
-            if ret:
+            # grab() is enough to probe the camera, no need to decode a frame
+            if cap.grab():
                 cameras.append(i)
             cap.release()
     
@@ -218,6 +356,11 @@ def list_cameras():
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--no-preview', action='store_true',
+                       help='run headless without the preview window')
+    args = parser.parse_args()
+
     print("="*60)
     print("NDI CAMERA TRANSMITTER")
     print("="*60)
@@ -253,7 +396,8 @@ def main():
     
     # Create and run transmitter
     try:
-        transmitter = NDITransmitter(camera_name, camera_id)
+        transmitter = NDITransmitter(camera_name, camera_id,
+                                    show_preview=not args.no_preview)
         transmitter.run()
     except Exception as e:
         print(f"Error: {e}")
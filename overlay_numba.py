@@ -0,0 +1,31 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def darken_strip(frame, h_strip, alpha):
+    """Darken the top h_strip rows of frame in place (frame * alpha)"""
+    # Only touches the strip that gets the overlay text, instead of
+    # blending a full-frame copy like cv2.addWeighted would
+    for y in prange(h_strip):
+        for x in range(frame.shape[1]):
+            for c in range(3):
+                frame[y, x, c] = np.uint8(frame[y, x, c] * alpha)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def bgr_to_bgra_with_strip(bgr, bgra_out, h_strip, alpha):
+    """Expand BGR to BGRA and darken the top h_strip rows in one pass"""
+    # Fuses what used to be addWeighted + cvtColor: each pixel is read
+    # once and written once instead of traversing the frame twice
+    for y in prange(bgr.shape[0]):
+        if y < h_strip:
+            for x in range(bgr.shape[1]):
+                for c in range(3):
+                    bgra_out[y, x, c] = np.uint8(bgr[y, x, c] * alpha)
+                bgra_out[y, x, 3] = np.uint8(255)
+        else:
+            for x in range(bgr.shape[1]):
+                for c in range(3):
+                    bgra_out[y, x, c] = bgr[y, x, c]
+                bgra_out[y, x, 3] = np.uint8(255)
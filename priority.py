@@ -0,0 +1,29 @@
+import ctypes
+import os
+import sys
+
+HIGH_PRIORITY_CLASS = 0x00000080
+
+
+def raise_process_priority():
+    """Give the capture process priority over background tasks"""
+    try:
+        if sys.platform == 'win32':
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            ctypes.windll.kernel32.SetPriorityClass(handle, HIGH_PRIORITY_CLASS)
+        else:
+            os.nice(-5)
+    except (OSError, AttributeError):
+        print("Could not raise process priority, continuing at normal")
+
+
+def pin_current_thread(core):
+    """Pin the calling thread to one core to reduce scheduling jitter"""
+    try:
+        if sys.platform == 'win32':
+            handle = ctypes.windll.kernel32.GetCurrentThread()
+            ctypes.windll.kernel32.SetThreadAffinityMask(handle, 1 << core)
+        else:
+            os.sched_setaffinity(0, {core})
+    except (OSError, AttributeError, ValueError):
+        pass